@@ -1,76 +1,169 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Optional
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
 
+from cachetools import TTLCache
+
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from fastapi import Depends, HTTPException, Request, status
-from itsdangerous import BadSignature, URLSafeTimedSerializer
-from passlib.context import CryptContext
+from sqlalchemy import bindparam, insert
 from sqlalchemy.exc import OperationalError
 from sqlmodel import Session, select
 
 from .database import get_session, init_db
-from .models import Activity, ActivityEntityType, Store, User, UserRole
+from .models import _ACTIVITY_ENTITY_MODELS, Activity, ActivityEntityType, Store, User, UserRole
 from .settings import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-serializer = URLSafeTimedSerializer(settings.secret_key)
 SESSION_COOKIE_NAME = "vape_crm_session"
 SESSION_MAX_AGE = 60 * 60 * 24 * 7
 
+# Session cookies are a fixed 16-byte packed payload (user_id, issued_at)
+# plus a truncated HMAC-SHA256 tag, base64url-encoded. Verifying one is a
+# single hash over 16 bytes instead of itsdangerous' JSON + HMAC-SHA1 walk.
+_SESSION_PAYLOAD = struct.Struct("<QQ")
+_SESSION_MAC_SIZE = 16
+_SESSION_KEY = settings.secret_key.encode("utf-8")
+# Pre-keyed template: copying it per call skips the HMAC key schedule
+# (ipad/opad derivation), leaving just the 16-byte update + digest.
+_SESSION_HMAC = hmac.new(_SESSION_KEY, digestmod=hashlib.sha256)
+
+
+def _session_mac(payload: bytes) -> bytes:
+    mac = _SESSION_HMAC.copy()
+    mac.update(payload)
+    return mac.digest()[:_SESSION_MAC_SIZE]
+
+# Dedicated pool for password hashing so it does not contend with the
+# default executor FastAPI uses for sync dependencies. Both argon2-cffi and
+# bcrypt release the GIL in their C cores, so verifies scale with cores.
+_HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="pwhash")
+
+# Argon2id: memory-hard, so GPU/ASIC cracking rigs lose their edge over
+# the defender. Parameters come from settings so operators can tune them.
+_password_hasher = PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost,
+    parallelism=settings.argon2_parallelism,
+)
+
+# Short-lived user_id -> User cache so authenticated requests skip the
+# per-request SELECT once warm. Entries are detached, read-only copies;
+# the 30s TTL bounds how stale a deactivation or role change can appear.
+_USER_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+_USER_CACHE_LOCK = threading.Lock()
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    with _USER_CACHE_LOCK:
+        _USER_CACHE.pop(user_id, None)
+
+
+# Built once so logins reuse the cached compilation instead of rebuilding
+# and recompiling the same SELECT per call. User.email is unique-indexed,
+# so the lookup itself is a single index probe.
+_USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return _password_hasher.verify(hashed_password, plain_password)
+    except InvalidHashError:
+        # Hashes minted before the Argon2id switch are bcrypt.
+        try:
+            return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+        except ValueError:
+            return False
+    except VerificationError:
+        return False
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _password_hasher.hash(password)
 
 
 def create_session_cookie(user_id: int) -> str:
-    return serializer.dumps({"user_id": user_id, "issued_at": datetime.utcnow().isoformat()})
+    payload = _SESSION_PAYLOAD.pack(user_id, int(time.time()))
+    return base64.urlsafe_b64encode(payload + _session_mac(payload)).rstrip(b"=").decode("ascii")
 
 
 def load_session_cookie(cookie_value: str) -> Optional[dict]:
     try:
-        return serializer.loads(cookie_value, max_age=SESSION_MAX_AGE)
-    except BadSignature:
+        raw = base64.urlsafe_b64decode(cookie_value.encode("ascii") + b"===")
+    except (ValueError, UnicodeEncodeError):
+        return None
+    if len(raw) != _SESSION_PAYLOAD.size + _SESSION_MAC_SIZE:
         return None
+    payload, mac = raw[: _SESSION_PAYLOAD.size], raw[_SESSION_PAYLOAD.size :]
+    if not hmac.compare_digest(mac, _session_mac(payload)):
+        return None
+    user_id, issued_at = _SESSION_PAYLOAD.unpack(payload)
+    if time.time() - issued_at > SESSION_MAX_AGE:
+        return None
+    return {"user_id": user_id, "issued_at": issued_at}
 
 
 async def get_current_user(request: Request, session: Session = Depends(get_session)) -> User:
+    cached = getattr(request.state, "user", None)
+    if cached is not None:
+        return cached
     cookie = request.cookies.get(SESSION_COOKIE_NAME)
     if not cookie:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
     payload = load_session_cookie(cookie)
     if not payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-    user = session.get(User, payload["user_id"])
+    user_id = payload["user_id"]
+    with _USER_CACHE_LOCK:
+        user = _USER_CACHE.get(user_id)
+    if user is None:
+        user = session.get(User, user_id)
+        if user is not None:
+            # Detach before caching so a later commit in this request cannot
+            # expire the instance out from under the next request.
+            session.expunge(user)
+            with _USER_CACHE_LOCK:
+                _USER_CACHE[user_id] = user
     if not user or not user.active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    request.state.user = user
     return user
 
 
 def require_roles(*roles: UserRole):
+    allowed = frozenset(roles)
+
     async def dependency(current_user: User = Depends(get_current_user)) -> User:
-        if current_user.role == UserRole.ADMIN:
+        if current_user.role is UserRole.ADMIN or current_user.role in allowed:
             return current_user
-        if current_user.role not in roles:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-        return current_user
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
     return dependency
 
 
-def authenticate_user(email: str, password: str, session: Session) -> Optional[User]:
-    query = select(User).where(User.email == email)
+async def authenticate_user(email: str, password: str, session: Session) -> Optional[User]:
+    params = {"email": email}
     try:
-        user = session.exec(query).first()
+        user = session.exec(_USER_BY_EMAIL, params=params).first()
     except OperationalError:
         session.rollback()
         init_db()
-        user = session.exec(query).first()
-    if not user or not verify_password(password, user.password_hash):
+        user = session.exec(_USER_BY_EMAIL, params=params).first()
+    if not user:
+        return None
+    loop = asyncio.get_running_loop()
+    valid = await loop.run_in_executor(_HASH_POOL, verify_password, password, user.password_hash)
+    if not valid:
         return None
     return user
 
@@ -83,6 +176,7 @@ def record_activity(
     entity_id: int,
     action: str,
     metadata: Optional[str] = None,
+    commit: bool = False,
 ) -> Activity:
     activity = Activity(
         actor_user_id=actor.id if actor else None,
@@ -92,18 +186,92 @@ def record_activity(
         details=metadata,
     )
     session.add(activity)
-    session.commit()
-    session.refresh(activity)
+    if commit:
+        session.commit()
+        session.refresh(activity)
+    else:
+        # Flush assigns the id but leaves the final commit (and its fsync)
+        # to the caller, so multi-activity paths pay for it once.
+        session.flush()
     return activity
 
 
+def record_activities(
+    session: Session,
+    *,
+    actor: Optional[User],
+    entries: Sequence[dict],
+    commit: bool = True,
+) -> None:
+    """Insert many audit rows in a single executemany round trip.
+
+    Each entry needs entity_type, entity_id, and action; metadata is
+    optional. Audit rows never need their generated ids back, so no
+    refresh happens.
+    """
+
+    if not entries:
+        return
+    actor_id = actor.id if actor else None
+    rows = [
+        {
+            "actor_user_id": actor_id,
+            "entity_type": entry["entity_type"],
+            "entity_id": entry["entity_id"],
+            "action": entry["action"],
+            "details": entry.get("metadata"),
+        }
+        for entry in entries
+    ]
+    session.execute(insert(Activity), rows)
+    if commit:
+        session.commit()
+
+
+def resolve_activity_entities(session: Session, activities: Sequence[Activity]) -> dict:
+    """Batch-load the rows a set of activities point at.
+
+    Groups by entity_type and issues one IN (...) select per type — at most
+    three queries for a whole feed — returning a map keyed by
+    (entity_type, entity_id).
+    """
+
+    ids_by_type: dict[ActivityEntityType, set[int]] = {}
+    for activity in activities:
+        ids_by_type.setdefault(activity.entity_type, set()).add(activity.entity_id)
+    resolved: dict = {}
+    for entity_type, ids in ids_by_type.items():
+        model = _ACTIVITY_ENTITY_MODELS[entity_type]
+        for row in session.exec(select(model).where(model.id.in_(ids))):
+            resolved[(entity_type, row.id)] = row
+    return resolved
+
+
+# Per-role access predicates: one dict lookup replaces the if/elif chain
+# that ran on every store authorization check.
+_STORE_ACCESS = {
+    UserRole.ADMIN: lambda user, store: True,
+    UserRole.SALESMAN: lambda user, store: store.owner_user_id == user.id,
+    UserRole.SUBSALESMAN: lambda user, store: store.sub_owner_user_id == user.id,
+    UserRole.CLIENT: lambda user, store: bool(store.id) and store.owner_user_id == user.id,
+}
+
+
 def can_access_store(user: User, store: Store) -> bool:
-    if user.role == UserRole.ADMIN:
-        return True
-    if user.role == UserRole.SALESMAN and store.owner_user_id == user.id:
-        return True
-    if user.role == UserRole.SUBSALESMAN and store.sub_owner_user_id == user.id:
-        return True
-    if user.role == UserRole.CLIENT and store.id and store.owner_user_id == user.id:
-        return True
-    return False
+    predicate = _STORE_ACCESS.get(user.role)
+    return predicate(user, store) if predicate else False
+
+
+def store_visibility_clause(user: User):
+    """SQL predicate limiting Store rows to the ones this user may list.
+
+    Returns None when no filter applies (admins and clients browse the
+    full list), so callers can push the check into WHERE instead of
+    materializing stores and filtering in Python.
+    """
+
+    if user.role is UserRole.SALESMAN:
+        return Store.owner_user_id == user.id
+    if user.role is UserRole.SUBSALESMAN:
+        return Store.sub_owner_user_id == user.id
+    return None
@@ -1,34 +1,142 @@
 from __future__ import annotations
 
-import json
-import smtplib
+import asyncio
+import logging
 from email.message import EmailMessage
-from typing import Iterable, Optional
+from typing import Iterable, List, Optional
+
+import aiosmtplib
+
+from functools import lru_cache
 
 from ..settings import settings
 
+logger = logging.getLogger(__name__)
+
+email_queue: "asyncio.Queue[tuple[str, str, list[str], list[str]]]" = asyncio.Queue()
+_worker_task: Optional[asyncio.Task] = None
+
+# One keep-alive SMTP connection shared by the worker: the TLS handshake and
+# SASL login are paid once, after which each email is a single DATA exchange.
+_smtp_client: Optional[aiosmtplib.SMTP] = None
+_smtp_lock = asyncio.Lock()
+
+
+def queue_email(subject: str, body: str, to_emails: Iterable[str], cc_emails: Optional[Iterable[str]] = None) -> None:
+    """Enqueue an email for the background worker; returns immediately."""
+
+    email_queue.put_nowait((subject, body, list(to_emails), list(cc_emails or [])))
+
+
+def _normalize_recipients(
+    to_emails: Iterable[str], cc_emails: Optional[Iterable[str]]
+) -> tuple[List[str], List[str]]:
+    """Strip, lowercase, and dedupe recipients in one pass.
+
+    A single `seen` set spans both lists so an address already in To is not
+    repeated in Cc, avoiding duplicate RCPT TO commands at the server.
+    """
+
+    seen: set[str] = set()
+    to_list = [e for e in (x.strip().lower() for x in to_emails) if e and not (e in seen or seen.add(e))]
+    cc_list = [e for e in (x.strip().lower() for x in (cc_emails or ())) if e and not (e in seen or seen.add(e))]
+    return to_list, cc_list
+
+
+@lru_cache(maxsize=128)
+def _rendered_mime(subject: str, body: str) -> bytes:
+    """Serialize the recipient-independent part of a message once.
+
+    Notification rules send the same rendered subject/body to many
+    recipients; caching the MIME bytes skips EmailMessage construction,
+    content encoding, and serialization on repeat sends.
+    """
+
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = settings.smtp_from_email
+    message.set_content(body)
+    return message.as_bytes()
+
+
+def _mime_with_recipients(subject: str, body: str, to_list: List[str], cc_list: List[str]) -> bytes:
+    headers = f"To: {', '.join(to_list)}\r\n"
+    if cc_list:
+        headers += f"Cc: {', '.join(cc_list)}\r\n"
+    return headers.encode("ascii") + _rendered_mime(subject, body)
+
+
+async def _connect_smtp() -> aiosmtplib.SMTP:
+    global _smtp_client
+    if _smtp_client is None:
+        _smtp_client = aiosmtplib.SMTP(hostname=settings.smtp_host, port=settings.smtp_port)
+    if not _smtp_client.is_connected:
+        await _smtp_client.connect()
+        if settings.smtp_username and settings.smtp_password:
+            await _smtp_client.starttls()
+            await _smtp_client.login(settings.smtp_username, settings.smtp_password)
+    return _smtp_client
+
+
+async def _send_email_async(subject: str, body: str, to_emails: Iterable[str], cc_emails: Optional[Iterable[str]] = None) -> None:
+    to_list, cc_list = _normalize_recipients(to_emails, cc_emails)
+    if not to_list:
+        return
+
+    if not settings.smtp_host:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("mock email %r", {"subject": subject, "body": body, "to": to_list, "cc": cc_list})
+        return
+
+    data = _mime_with_recipients(subject, body, to_list, cc_list)
+    recipients = to_list + cc_list
+    async with _smtp_lock:
+        client = await _connect_smtp()
+        try:
+            await client.sendmail(str(settings.smtp_from_email), recipients, data)
+        except aiosmtplib.SMTPServerDisconnected:
+            # Keep-alive connection was dropped by the server; reconnect once.
+            # close() is used instead of quit(), which raises again on an
+            # already-disconnected client and would skip the retry.
+            client.close()
+            client = await _connect_smtp()
+            await client.sendmail(str(settings.smtp_from_email), recipients, data)
+
+
+async def _email_worker() -> None:
+    while True:
+        subject, body, to_emails, cc_emails = await email_queue.get()
+        try:
+            await _send_email_async(subject, body, to_emails, cc_emails)
+        except Exception as exc:  # noqa: BLE001 - a failed email must not kill the worker
+            logger.warning("email send failed: %s", exc)
+        finally:
+            email_queue.task_done()
+
+
+def start_email_worker() -> None:
+    global _worker_task
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.get_running_loop().create_task(_email_worker())
+
 
 def send_email(subject: str, body: str, to_emails: Iterable[str], cc_emails: Optional[Iterable[str]] = None) -> None:
-    to_list = list(dict.fromkeys(to_emails))
-    cc_list = list(dict.fromkeys(cc_emails or []))
+    """Synchronous, connect-per-call send; prefer queue_email in request paths."""
+
+    to_list, cc_list = _normalize_recipients(to_emails, cc_emails)
     if not to_list:
         return
 
     if not settings.smtp_host:
-        print("EMAIL SEND (mock)")
-        print(json.dumps({"subject": subject, "body": body, "to": to_list, "cc": cc_list}, indent=2))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("mock email %r", {"subject": subject, "body": body, "to": to_list, "cc": cc_list})
         return
 
-    message = EmailMessage()
-    message["Subject"] = subject
-    message["From"] = settings.smtp_from_email
-    message["To"] = ", ".join(to_list)
-    if cc_list:
-        message["Cc"] = ", ".join(cc_list)
-    message.set_content(body)
+    import smtplib  # deferred: only the real-send branch needs it
 
+    data = _mime_with_recipients(subject, body, to_list, cc_list)
     with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
         if settings.smtp_username and settings.smtp_password:
             server.starttls()
             server.login(settings.smtp_username, settings.smtp_password)
-        server.send_message(message)
+        server.sendmail(str(settings.smtp_from_email), to_list + cc_list, data)
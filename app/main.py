@@ -1,37 +1,136 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import re
 import secrets
-from datetime import datetime, timedelta
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from fastapi import Depends, FastAPI, File, Form, HTTPException, Request, Response, UploadFile
-from fastapi.responses import HTMLResponse, RedirectResponse
+import orjson
+from cachetools import TTLCache
+from fastapi import BackgroundTasks, Depends, FastAPI, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from starlette.middleware.sessions import SessionMiddleware
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from pydantic import BaseModel
+from sqlalchemy.orm import aliased, raiseload, selectinload
 from sqlmodel import Session, select
 
 from . import auth
 from .auth import SESSION_COOKIE_NAME, create_session_cookie, get_current_user, get_password_hash, require_roles
-from .database import get_session, init_db
-from .email.service import send_email
-from .models import ActivityEntityType, EmailRule, EmailTrigger, Store, StoreStatus, User, UserRole
+from .database import engine, get_session, init_db
+from .email.service import queue_email, start_email_worker
+from .models import ActivityEntityType, EmailRule, EmailTrigger, Order, Store, StoreStatus, User, UserRole
 from .services import reports
 from .services.importer import import_orders
+from .services.rollups import refresh_rollups
 from .settings import settings
 from .utils.geocode import geocode_address
 
 BASE_DIR = Path(__file__).resolve().parent
-app = FastAPI(title=settings.app_name)
-app.add_middleware(SessionMiddleware, secret_key=settings.secret_key)
+app = FastAPI(title=settings.app_name, default_response_class=ORJSONResponse)
 app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+
+# Compiled templates are cached as bytecode on disk so each worker parses a
+# template at most once per deploy; auto_reload only re-stats files in debug.
+_JINJA_CACHE_DIR = Path(tempfile.gettempdir()) / "vape_crm_jinja_cache"
+_JINJA_CACHE_DIR.mkdir(exist_ok=True)
+_jinja_env = Environment(
+    loader=FileSystemLoader(BASE_DIR / "templates"),
+    autoescape=select_autoescape(("html", "xml")),
+    bytecode_cache=FileSystemBytecodeCache(str(_JINJA_CACHE_DIR)),
+    auto_reload=settings.debug,
+    cache_size=400,
+)
+# Constructing Jinja2Templates wires Starlette's url_for global into the
+# environment; responses are rendered from direct Template references below.
+templates = Jinja2Templates(env=_jinja_env)
+
+# Direct references to compiled templates, filled at startup, so a render
+# skips the loader's get_or_select_template walk entirely.
+_TEMPLATE_OBJECTS: Dict[str, Any] = {}
+
+
+def _render(name: str, context: Dict[str, Any], status_code: int = 200) -> HTMLResponse:
+    template = None if settings.debug else _TEMPLATE_OBJECTS.get(name)
+    if template is None:
+        template = _jinja_env.get_template(name)
+    return HTMLResponse(template.render(context), status_code=status_code)
 
 
 @app.on_event("startup")
-def startup() -> None:
+async def startup() -> None:
     init_db()
+    with Session(engine) as session:
+        refresh_rollups(session)
+    start_email_worker()
+    # Pre-warm so the first request never pays template compilation.
+    for template_path in (BASE_DIR / "templates").glob("*.html"):
+        _TEMPLATE_OBJECTS[template_path.name] = _jinja_env.get_template(template_path.name)
+
+
+_STORE_STATUS_OPTIONS = tuple(StoreStatus)
+
+# Email rules only change when an admin edits them; a short TTL keeps the
+# store-creation hot path from re-querying EmailRule every time. Lookups
+# run on the event loop while rule edits pop entries from the
+# threadpool, so accesses take the lock (same pattern as auth._USER_CACHE).
+_RULE_CACHE: TTLCache = TTLCache(maxsize=16, ttl=60)
+_RULE_CACHE_LOCK = threading.Lock()
+
+# Dashboard aggregates change at order-import cadence, not per request; a
+# short per-user TTL absorbs rapid refreshes and is cleared after imports.
+_DASHBOARD_CACHE: TTLCache = TTLCache(maxsize=256, ttl=60)
+
+# Same idea for the reports page, which runs the heavier rollup queries.
+# TTLCache is not thread-safe and these are touched from the event loop
+# and cleared from the threadpool; one lock covers both report caches.
+_REPORTS_CACHE: TTLCache = TTLCache(maxsize=256, ttl=60)
+_REPORT_CACHE_LOCK = threading.RLock()
+
+
+def _notification_recipients(session: Session, trigger: EmailTrigger) -> tuple[List[str], Optional[List[str]]]:
+    with _RULE_CACHE_LOCK:
+        cached = _RULE_CACHE.get(trigger)
+    if cached is None:
+        rule = session.exec(select(EmailRule).where(EmailRule.trigger == trigger)).first()
+        recipients = [settings.default_admin_email]
+        if rule and rule.active:
+            recipients = rule.to_emails or recipients
+        cached = (recipients, rule.cc_emails if rule else None)
+        with _RULE_CACHE_LOCK:
+            _RULE_CACHE[trigger] = cached
+    return cached
+
+
+@lru_cache(maxsize=4)
+def _month_window(year: int, month: int) -> tuple[datetime, datetime, str]:
+    """Month boundaries for the dashboard; changes once a month, so cached.
+
+    Returns naive datetimes to match the naive UTC timestamps stored on
+    orders.
+    """
+
+    start_month = datetime(year, month, 1)
+    previous_month = start_month - timedelta(days=1)
+    return start_month, datetime(year, 1, 1), previous_month.strftime("%B %Y")
+
+
+def _run_report(fn, current_user: User, *args: Any, **kwargs: Any):
+    """Run one report on the threadpool with its own short-lived session.
+
+    Sessions are not safe to share across concurrently running threads, so
+    each gathered report opens its own.
+    """
+
+    with Session(engine) as session:
+        return fn(session, current_user, *args, **kwargs)
 
 
 def _set_session_cookie(response: Response, user_id: int) -> None:
@@ -49,14 +148,14 @@ async def root(request: Request) -> Response:
 
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request, "app_name": settings.app_name})
+    return _render("login.html", {"request": request, "app_name": settings.app_name})
 
 
 @app.post("/login")
 async def login_submit(request: Request, email: str = Form(...), password: str = Form(...), session: Session = Depends(get_session)):
-    user = auth.authenticate_user(email, password, session)
+    user = await auth.authenticate_user(email, password, session)
     if not user:
-        return templates.TemplateResponse(
+        return _render(
             "login.html",
             {"request": request, "app_name": settings.app_name, "error": "Invalid credentials"},
             status_code=400,
@@ -67,22 +166,34 @@ async def login_submit(request: Request, email: str = Form(...), password: str =
 
 
 @app.get("/logout")
-async def logout() -> Response:
+async def logout(request: Request) -> Response:
+    cookie = request.cookies.get(SESSION_COOKIE_NAME)
+    payload = auth.load_session_cookie(cookie) if cookie else None
+    if payload:
+        auth.invalidate_user_cache(payload["user_id"])
     response = RedirectResponse(url="/login")
     response.delete_cookie(SESSION_COOKIE_NAME)
     return response
 
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    now = datetime.utcnow()
-    start_month = datetime(now.year, now.month, 1)
-    previous_month = start_month - timedelta(days=1)
-    mtd = reports.revenue_totals(session, current_user, start=start_month)
-    ytd = reports.revenue_totals(session, current_user, start=datetime(now.year, 1, 1))
-    inactive = reports.inactive_stores(session, current_user, days=30)
-    category = reports.category_mix(session, current_user)
-    top_products = reports.top_products(session, current_user, limit=5)
+async def dashboard(request: Request, current_user: User = Depends(get_current_user)):
+    now = datetime.now(tz=timezone.utc)
+    start_month, year_start, previous_month_label = _month_window(now.year, now.month)
+    cache_key = (current_user.id, current_user.role, start_month)
+    with _REPORT_CACHE_LOCK:
+        cached = _DASHBOARD_CACHE.get(cache_key)
+    if cached is None:
+        cached = await asyncio.gather(
+            asyncio.to_thread(_run_report, reports.revenue_totals, current_user, start=start_month),
+            asyncio.to_thread(_run_report, reports.revenue_totals, current_user, start=year_start),
+            asyncio.to_thread(_run_report, reports.inactive_stores, current_user, days=30),
+            asyncio.to_thread(_run_report, reports.category_mix, current_user),
+            asyncio.to_thread(_run_report, reports.top_products, current_user, limit=5),
+        )
+        with _REPORT_CACHE_LOCK:
+            _DASHBOARD_CACHE[cache_key] = cached
+    mtd, ytd, inactive, category, top_products = cached
 
     context = {
         "request": request,
@@ -92,33 +203,37 @@ async def dashboard(request: Request, session: Session = Depends(get_session), c
         "inactive": inactive,
         "category_mix": category,
         "top_products": top_products,
-        "previous_month": previous_month.strftime("%B %Y"),
+        "previous_month": previous_month_label,
     }
-    return templates.TemplateResponse("dashboard.html", context)
+    return _render("dashboard.html", context)
 
 
 @app.get("/stores", response_class=HTMLResponse)
-async def list_stores(request: Request, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    query = select(Store)
-    if current_user.role == UserRole.SALESMAN:
-        query = query.where(Store.owner_user_id == current_user.id)
-    elif current_user.role == UserRole.SUBSALESMAN:
-        query = query.where(Store.sub_owner_user_id == current_user.id)
+def list_stores(request: Request, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+    # The template reads owner/sub_owner names, so load them in two batched
+    # SELECTs; raiseload turns any new lazy access into a loud failure
+    # instead of a silent N+1.
+    query = select(Store).options(
+        selectinload(Store.owner), selectinload(Store.sub_owner), raiseload("*")
+    )
+    visibility = auth.store_visibility_clause(current_user)
+    if visibility is not None:
+        query = query.where(visibility)
     stores = session.exec(query.order_by(Store.city, Store.display_name)).all()
-    return templates.TemplateResponse(
+    return _render(
         "stores.html",
         {
             "request": request,
             "stores": stores,
             "user": current_user,
-            "status_options": list(StoreStatus),
+            "status_options": _STORE_STATUS_OPTIONS,
         },
     )
 
 
 @app.get("/stores/map", response_class=HTMLResponse)
 async def stores_map(request: Request, current_user: User = Depends(get_current_user)):
-    return templates.TemplateResponse(
+    return _render(
         "map.html",
         {
             "request": request,
@@ -128,122 +243,234 @@ async def stores_map(request: Request, current_user: User = Depends(get_current_
     )
 
 
+# The geojson payload only changes when a store row does, so the serialized
+# bytes are memoized per visibility scope and invalidated by bumping a
+# version counter from the store write paths. The TTL bounds staleness
+# across workers: version bumps are per-process, so siblings would
+# otherwise serve old bytes forever under the multi-worker entrypoint.
+# Accesses come from threadpool handlers and the event loop alike, and
+# TTLCache is not thread-safe, so the lock guards cache and version both.
+_GEOJSON_CACHE: TTLCache = TTLCache(maxsize=256, ttl=60)
+_GEOJSON_LOCK = threading.Lock()
+_GEOJSON_VERSION = 0
+
+
+def _bump_geojson_version() -> None:
+    global _GEOJSON_VERSION
+    with _GEOJSON_LOCK:
+        _GEOJSON_VERSION += 1
+        _GEOJSON_CACHE.clear()
+
+
 @app.get("/api/stores.geojson")
-async def stores_geojson(session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    query = select(Store)
-    if current_user.role == UserRole.SALESMAN:
-        query = query.where(Store.owner_user_id == current_user.id)
-    elif current_user.role == UserRole.SUBSALESMAN:
-        query = query.where(Store.sub_owner_user_id == current_user.id)
-    stores = session.exec(query).all()
-    features: List[Dict[str, Any]] = []
-    for store in stores:
-        if store.latitude is None or store.longitude is None:
-            continue
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [store.longitude, store.latitude]},
-                "properties": {
-                    "id": store.id,
-                    "name": store.display_name,
-                    "status": store.status,
-                    "city": store.city,
-                    "province": store.province,
-                    "owner": store.owner.name if store.owner else None,
-                    "sub_owner": store.sub_owner.name if store.sub_owner else None,
-                    "last_order_date": store.last_order_date.isoformat() if store.last_order_date else None,
-                },
-            }
+def stores_geojson(request: Request, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+    visibility = auth.store_visibility_clause(current_user)
+    # Users without a visibility clause all see the same payload.
+    with _GEOJSON_LOCK:
+        cache_key = (current_user.id if visibility is not None else 0, _GEOJSON_VERSION)
+        cached = _GEOJSON_CACHE.get(cache_key)
+    if cached is not None:
+        payload, etag = cached
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=payload, media_type="application/json", headers={"ETag": etag})
+    # Fetch only the columns the feature payload needs; skipping ORM object
+    # hydration keeps a few thousand stores cheap to serialize.
+    owner_user = aliased(User)
+    sub_user = aliased(User)
+    query = (
+        select(
+            Store.id,
+            Store.display_name,
+            Store.status,
+            Store.city,
+            Store.province,
+            Store.longitude,
+            Store.latitude,
+            Store.last_order_date,
+            owner_user.name,
+            sub_user.name,
         )
-    return {"type": "FeatureCollection", "features": features}
+        .join(owner_user, Store.owner_user_id == owner_user.id, isouter=True)
+        .join(sub_user, Store.sub_owner_user_id == sub_user.id, isouter=True)
+        .where(Store.latitude.is_not(None), Store.longitude.is_not(None))
+    )
+    if visibility is not None:
+        query = query.where(visibility)
+    features: List[Dict[str, Any]] = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [longitude, latitude]},
+            "properties": {
+                "id": store_id,
+                "name": name,
+                "status": store_status,
+                "city": city,
+                "province": province,
+                "owner": owner_name,
+                "sub_owner": sub_owner_name,
+                "last_order_date": last_order_date.isoformat() if last_order_date else None,
+            },
+        }
+        for store_id, name, store_status, city, province, longitude, latitude, last_order_date, owner_name, sub_owner_name in session.exec(query)
+    ]
+    payload = orjson.dumps({"type": "FeatureCollection", "features": features})
+    etag = f'"{hashlib.md5(payload).hexdigest()}"'
+    with _GEOJSON_LOCK:
+        _GEOJSON_CACHE[cache_key] = (payload, etag)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=payload, media_type="application/json", headers={"ETag": etag})
 
 
 @app.get("/stores/new", response_class=HTMLResponse)
-async def new_store_form(request: Request, session: Session = Depends(get_session), current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.SALESMAN))):
-    salesmen = session.exec(select(User).where(User.role == UserRole.SALESMAN)).all()
-    subs = session.exec(select(User).where(User.role == UserRole.SUBSALESMAN)).all()
-    return templates.TemplateResponse(
+def new_store_form(request: Request, session: Session = Depends(get_session), current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.SALESMAN))):
+    users = session.exec(
+        select(User)
+        .where(User.role.in_([UserRole.SALESMAN, UserRole.SUBSALESMAN]))
+        .order_by(User.role, User.name)
+    ).all()
+    salesmen = [user for user in users if user.role is UserRole.SALESMAN]
+    subs = [user for user in users if user.role is UserRole.SUBSALESMAN]
+    return _render(
         "store_form.html",
         {"request": request, "user": current_user, "salesmen": salesmen, "subs": subs},
     )
 
 
+async def _geocode_and_update(store_id: int, address: str) -> None:
+    """Resolve a store's coordinates after the response has gone out."""
+
+    geo = await geocode_address(address)
+    if not geo:
+        return
+    with Session(engine) as session:
+        store = session.get(Store, store_id)
+        if not store:
+            return
+        store.latitude, store.longitude, place_id = geo
+        if not store.google_place_id:
+            store.google_place_id = place_id
+        session.add(store)
+        session.commit()
+    _bump_geojson_version()
+
+
+class StoreCreateForm(BaseModel):
+    """Form payload for store creation, bound as one cached dependency."""
+
+    display_name: str
+    city: str
+    province: str
+    owner_user_id: Optional[int] = None
+    sub_owner_user_id: Optional[int] = None
+    address1: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    google_place_id: Optional[str] = None
+
+    @classmethod
+    def as_form(
+        cls,
+        display_name: str = Form(...),
+        city: str = Form(...),
+        province: str = Form(...),
+        owner_user_id: Optional[int] = Form(None),
+        sub_owner_user_id: Optional[int] = Form(None),
+        address1: Optional[str] = Form(None),
+        latitude: Optional[float] = Form(None),
+        longitude: Optional[float] = Form(None),
+        google_place_id: Optional[str] = Form(None),
+    ) -> "StoreCreateForm":
+        return cls(
+            display_name=display_name,
+            city=city,
+            province=province,
+            owner_user_id=owner_user_id,
+            sub_owner_user_id=sub_owner_user_id,
+            address1=address1,
+            latitude=latitude,
+            longitude=longitude,
+            google_place_id=google_place_id,
+        )
+
+
 @app.post("/stores/new")
 async def create_store(
     request: Request,
-    display_name: str = Form(...),
-    city: str = Form(...),
-    province: str = Form(...),
-    owner_user_id: Optional[int] = Form(None),
-    sub_owner_user_id: Optional[int] = Form(None),
-    address1: Optional[str] = Form(None),
-    latitude: Optional[float] = Form(None),
-    longitude: Optional[float] = Form(None),
-    google_place_id: Optional[str] = Form(None),
+    background_tasks: BackgroundTasks,
+    form: StoreCreateForm = Depends(StoreCreateForm.as_form),
     session: Session = Depends(get_session),
     current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.SALESMAN)),
 ):
-    duplicate = None
-    if google_place_id:
-        duplicate = session.exec(select(Store).where(Store.google_place_id == google_place_id)).first()
-    elif address1:
-        duplicate = session.exec(
-            select(Store).where(Store.display_name == display_name, Store.address1 == address1)
+    duplicate_id = None
+    if form.google_place_id:
+        duplicate_id = session.exec(
+            select(Store.id).where(Store.google_place_id == form.google_place_id).limit(1)
+        ).first()
+    elif form.address1:
+        duplicate_id = session.exec(
+            select(Store.id)
+            .where(Store.display_name == form.display_name, Store.address1 == form.address1)
+            .limit(1)
         ).first()
-    if duplicate:
+    if duplicate_id is not None:
         raise HTTPException(status_code=400, detail="Store already exists")
 
     store = Store(
-        display_name=display_name,
-        city=city,
-        province=province,
-        owner_user_id=owner_user_id or current_user.id,
-        sub_owner_user_id=sub_owner_user_id,
-        address1=address1,
-        google_place_id=google_place_id,
+        display_name=form.display_name,
+        city=form.city,
+        province=form.province,
+        owner_user_id=form.owner_user_id or current_user.id,
+        sub_owner_user_id=form.sub_owner_user_id,
+        address1=form.address1,
+        google_place_id=form.google_place_id,
     )
 
-    if (latitude is None or longitude is None) and address1:
-        geo = await geocode_address(f"{address1}, {city}, {province}")
-        if geo:
-            store.latitude, store.longitude, place_id = geo
-            if not store.google_place_id:
-                store.google_place_id = place_id
-    else:
-        store.latitude = latitude
-        store.longitude = longitude
+    needs_geocode = (form.latitude is None or form.longitude is None) and bool(form.address1)
+    if not needs_geocode:
+        store.latitude = form.latitude
+        store.longitude = form.longitude
 
     session.add(store)
+    # Flush assigns the id so the activity row rides in the same commit.
+    session.flush()
+    auth.record_activity(session, actor=current_user, entity_type=ActivityEntityType.STORE, entity_id=store.id, action="created")
     session.commit()
-    session.refresh(store)
+    _bump_geojson_version()
 
-    auth.record_activity(session, actor=current_user, entity_type=ActivityEntityType.STORE, entity_id=store.id, action="created")
+    if needs_geocode:
+        # Geocoding is an external HTTP call; run it after the redirect so
+        # store creation doesn't wait on Google.
+        background_tasks.add_task(
+            _geocode_and_update, store.id, f"{form.address1}, {form.city}, {form.province}"
+        )
 
-    admin_rule = session.exec(select(EmailRule).where(EmailRule.trigger == EmailTrigger.NEW_STORE_CREATED)).first()
-    recipients = [settings.default_admin_email]
-    if admin_rule and admin_rule.active:
-        recipients = admin_rule.to_emails or recipients
+    recipients, cc_recipients = _notification_recipients(session, EmailTrigger.NEW_STORE_CREATED)
     map_link = f"https://www.google.com/maps/search/?api=1&query={store.latitude},{store.longitude}" if store.latitude else ""
-    send_email(
+    queue_email(
         subject=f"New store created: {store.display_name}",
         body=f"Store {store.display_name} created by {current_user.name}. View: {map_link}",
         to_emails=recipients,
-        cc_emails=admin_rule.cc_emails if admin_rule else None,
+        cc_emails=cc_recipients,
     )
 
     return RedirectResponse(url=f"/stores/{store.id}", status_code=302)
 
 
 @app.get("/stores/{store_id}", response_class=HTMLResponse)
-async def store_detail(store_id: int, request: Request, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    store = session.get(Store, store_id)
+def store_detail(store_id: int, request: Request, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+    store = session.get(
+        Store, store_id, options=[selectinload(Store.owner), selectinload(Store.sub_owner)]
+    )
     if not store:
         raise HTTPException(status_code=404)
     if not auth.can_access_store(current_user, store):
         raise HTTPException(status_code=403)
-    orders = sorted(store.orders, key=lambda o: o.order_date, reverse=True)
-    return templates.TemplateResponse(
+    orders = session.exec(
+        select(Order).where(Order.store_id == store_id).order_by(Order.order_date.desc()).limit(100)
+    ).all()
+    return _render(
         "store_detail.html",
         {
             "request": request,
@@ -255,7 +482,7 @@ async def store_detail(store_id: int, request: Request, session: Session = Depen
 
 
 @app.post("/stores/{store_id}/update")
-async def update_store(
+def update_store(
     store_id: int,
     request: Request,
     status: StoreStatus = Form(...),
@@ -271,27 +498,35 @@ async def update_store(
     store.status = status
     store.notes = notes
     session.add(store)
-    session.commit()
-
     auth.record_activity(session, actor=current_user, entity_type=ActivityEntityType.STORE, entity_id=store.id, action="updated")
+    session.commit()
+    _bump_geojson_version()
     return RedirectResponse(url=f"/stores/{store.id}", status_code=302)
 
 
 @app.get("/orders/import", response_class=HTMLResponse)
 async def order_import_page(request: Request, current_user: User = Depends(get_current_user)):
-    return templates.TemplateResponse("order_import.html", {"request": request, "user": current_user})
+    return _render("order_import.html", {"request": request, "user": current_user})
 
 
 @app.post("/orders/import")
-async def order_import(
+def order_import(
     request: Request,
     file: UploadFile = File(...),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    content = await file.read()
-    summary = import_orders(session, current_user=current_user, file_content=content)
-    return templates.TemplateResponse(
+    # Hand the importer the underlying spooled file so rows are parsed as
+    # they are read instead of buffering the whole upload; the sync handler
+    # runs on the threadpool, keeping the event loop free.
+    summary = import_orders(session, current_user=current_user, stream=file.file)
+    refresh_rollups(session)
+    with _REPORT_CACHE_LOCK:
+        _DASHBOARD_CACHE.clear()
+        _REPORTS_CACHE.clear()
+    # Imports touch Store.last_order_date, which the geojson renders.
+    _bump_geojson_version()
+    return _render(
         "order_import.html",
         {
             "request": request,
@@ -302,12 +537,21 @@ async def order_import(
 
 
 @app.get("/reports", response_class=HTMLResponse)
-async def reports_page(request: Request, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    monthly = reports.monthly_spend(session, current_user)
-    province = reports.province_breakdown(session, current_user)
-    inactive_30 = reports.inactive_stores(session, current_user, days=30)
-    top = reports.top_products(session, current_user)
-    return templates.TemplateResponse(
+async def reports_page(request: Request, current_user: User = Depends(get_current_user)):
+    cache_key = (current_user.id, current_user.role)
+    with _REPORT_CACHE_LOCK:
+        cached = _REPORTS_CACHE.get(cache_key)
+    if cached is None:
+        cached = await asyncio.gather(
+            asyncio.to_thread(_run_report, reports.monthly_spend, current_user),
+            asyncio.to_thread(_run_report, reports.province_breakdown, current_user),
+            asyncio.to_thread(_run_report, reports.inactive_stores, current_user, days=30),
+            asyncio.to_thread(_run_report, reports.top_products, current_user),
+        )
+        with _REPORT_CACHE_LOCK:
+            _REPORTS_CACHE[cache_key] = cached
+    monthly, province, inactive_30, top = cached
+    return _render(
         "reports.html",
         {
             "request": request,
@@ -321,13 +565,13 @@ async def reports_page(request: Request, session: Session = Depends(get_session)
 
 
 @app.get("/users", response_class=HTMLResponse)
-async def users_page(request: Request, session: Session = Depends(get_session), current_user: User = Depends(require_roles(UserRole.ADMIN))):
+def users_page(request: Request, session: Session = Depends(get_session), current_user: User = Depends(require_roles(UserRole.ADMIN))):
     users = session.exec(select(User).order_by(User.role, User.name)).all()
-    return templates.TemplateResponse("users.html", {"request": request, "user": current_user, "users": users})
+    return _render("users.html", {"request": request, "user": current_user, "users": users})
 
 
 @app.post("/users")
-async def create_user(
+def create_user(
     request: Request,
     name: str = Form(...),
     email: str = Form(...),
@@ -336,24 +580,33 @@ async def create_user(
     session: Session = Depends(get_session),
     current_user: User = Depends(require_roles(UserRole.ADMIN)),
 ):
-    existing = session.exec(select(User).where(User.email == email)).first()
-    if existing:
+    existing_id = session.exec(select(User.id).where(User.email == email).limit(1)).first()
+    if existing_id is not None:
         raise HTTPException(status_code=400, detail="User already exists")
     user = User(name=name, email=email, role=role, password_hash=get_password_hash(password))
     session.add(user)
-    session.commit()
+    session.flush()
     auth.record_activity(session, actor=current_user, entity_type=ActivityEntityType.USER, entity_id=user.id, action="created")
+    session.commit()
     return RedirectResponse(url="/users", status_code=302)
 
 
+# Accepts comma- and/or whitespace-separated address lists in one pass.
+_EMAIL_SPLIT = re.compile(r"[,\s]+")
+
+
+def _split_emails(raw: str) -> List[str]:
+    return [entry for entry in _EMAIL_SPLIT.split(raw) if entry]
+
+
 @app.get("/settings/email", response_class=HTMLResponse)
-async def email_settings(request: Request, session: Session = Depends(get_session), current_user: User = Depends(require_roles(UserRole.ADMIN))):
+def email_settings(request: Request, session: Session = Depends(get_session), current_user: User = Depends(require_roles(UserRole.ADMIN))):
     rules = session.exec(select(EmailRule)).all()
-    return templates.TemplateResponse("email_settings.html", {"request": request, "user": current_user, "rules": rules})
+    return _render("email_settings.html", {"request": request, "user": current_user, "rules": rules})
 
 
 @app.post("/settings/email")
-async def update_email_rule(
+def update_email_rule(
     rule_id: Optional[int] = Form(None),
     trigger: EmailTrigger = Form(...),
     to_emails: str = Form(""),
@@ -363,8 +616,8 @@ async def update_email_rule(
     session: Session = Depends(get_session),
     current_user: User = Depends(require_roles(UserRole.ADMIN)),
 ):
-    to_list = [email.strip() for email in to_emails.split(",") if email.strip()]
-    cc_list = [email.strip() for email in cc_emails.split(",") if email.strip()]
+    to_list = _split_emails(to_emails)
+    cc_list = _split_emails(cc_emails)
     if rule_id:
         rule = session.get(EmailRule, rule_id)
         if not rule:
@@ -377,9 +630,33 @@ async def update_email_rule(
     rule.template_name = template_name
     session.add(rule)
     session.commit()
+    with _RULE_CACHE_LOCK:
+        _RULE_CACHE.pop(rule.trigger, None)
     return RedirectResponse(url="/settings/email", status_code=302)
 
 
+# Load balancers probe /health at high frequency; serve pre-encoded bytes so
+# each probe skips dict allocation and JSON encoding entirely.
+_HEALTH_BODY = b'{"status": "ok"}'
+
+
 @app.get("/health")
-async def healthcheck() -> Dict[str, str]:
-    return {"status": "ok"}
+async def healthcheck() -> Response:
+    return Response(content=_HEALTH_BODY, media_type="application/json")
+
+
+if __name__ == "__main__":
+    import os
+
+    import uvicorn
+
+    workers = settings.uvicorn_workers or (os.cpu_count() or 1) * 2 + 1
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=settings.debug,
+        workers=1 if settings.debug else workers,
+        loop="uvloop",
+        http="httptools",
+    )
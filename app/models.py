@@ -1,8 +1,9 @@
 import enum
 from datetime import datetime, date
-from typing import Optional
+from typing import List, Optional
 
-from sqlalchemy import JSON, Column, Text
+from sqlalchemy import JSON, Column, DateTime, Enum as SAEnum, Index, Text, func
+from sqlalchemy.orm import Mapped
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -35,15 +36,22 @@ class EmailTrigger(str, enum.Enum):
 class UserBase(SQLModel):
     name: str
     email: str = Field(index=True, unique=True)
-    role: UserRole = Field(default=UserRole.CLIENT)
+    # Stored as a plain indexed VARCHAR so role filters can seek the index
+    # and the schema stays portable across backends.
+    role: UserRole = Field(
+        default=UserRole.CLIENT,
+        sa_column=Column(SAEnum(UserRole, native_enum=False, length=16), index=True, nullable=False),
+    )
     active: bool = True
 
 
 class User(UserBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     password_hash: str
-    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
-    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    created_at: datetime = Field(sa_column=Column(DateTime, server_default=func.now(), nullable=False))
+    updated_at: datetime = Field(
+        sa_column=Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    )
 
     owned_stores: Mapped[list["Store"]] = Relationship(
         back_populates="owner", sa_relationship_kwargs={"foreign_keys": "Store.owner_user_id"}
@@ -65,21 +73,36 @@ class StoreBase(SQLModel):
     province: str
     postal_code: Optional[str] = None
     country: str = "Canada"
-    latitude: Optional[float] = Field(default=None, index=True)
-    longitude: Optional[float] = Field(default=None, index=True)
+    # No query ranges over coordinates, so latitude/longitude are not
+    # indexed; the geojson NULL filter is served by the composite indexes.
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     google_place_id: Optional[str] = Field(default=None, index=True)
-    status: StoreStatus = Field(default=StoreStatus.LEAD)
+    status: StoreStatus = Field(
+        default=StoreStatus.LEAD,
+        sa_column=Column(SAEnum(StoreStatus, native_enum=False, length=16), index=True, nullable=False),
+    )
     tags: List[str] = Field(default_factory=list, sa_column=Column(JSON))
     notes: Optional[str] = None
     last_order_date: Optional[date] = Field(default=None, index=True)
 
 
 class Store(StoreBase, table=True):
+    # Composite indexes match the role-scoped listings, which filter by an
+    # owner column and order by (city, display_name); the DB can then walk
+    # the index instead of seq-scanning and sorting.
+    __table_args__ = (
+        Index("ix_store_owner_city_name", "owner_user_id", "city", "display_name"),
+        Index("ix_store_subowner_city_name", "sub_owner_user_id", "city", "display_name"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     owner_user_id: Optional[int] = Field(default=None, foreign_key="user.id")
     sub_owner_user_id: Optional[int] = Field(default=None, foreign_key="user.id")
-    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
-    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    created_at: datetime = Field(sa_column=Column(DateTime, server_default=func.now(), nullable=False))
+    updated_at: datetime = Field(
+        sa_column=Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    )
 
     owner: Mapped[Optional[User]] = Relationship(
         back_populates="owned_stores", sa_relationship_kwargs={"foreign_keys": "Store.owner_user_id"}
@@ -106,12 +129,20 @@ class OrderBase(SQLModel):
 
 
 class Order(OrderBase, table=True):
+    # Backs the store-detail listing: newest orders for one store.
+    __table_args__ = (Index("ix_order_store_date", "store_id", "order_date"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     store_id: Optional[int] = Field(default=None, foreign_key="store.id", index=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
-    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    created_at: datetime = Field(sa_column=Column(DateTime, server_default=func.now(), nullable=False))
+    updated_at: datetime = Field(
+        sa_column=Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    )
 
-    store: Mapped[Optional[Store]] = Relationship(back_populates="orders")
+    # Many-to-one with the FK on this side: fetch in the same SELECT.
+    store: Mapped[Optional[Store]] = Relationship(
+        back_populates="orders", sa_relationship_kwargs={"lazy": "joined"}
+    )
     items: Mapped[list["OrderItem"]] = Relationship(back_populates="order")
 
 
@@ -129,7 +160,7 @@ class OrderItemBase(SQLModel):
 
 class OrderItem(OrderItemBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    order_id: int = Field(foreign_key="order.id")
+    order_id: int = Field(foreign_key="order.id", index=True)
 
     order: Mapped[Order] = Relationship(back_populates="items")
 
@@ -144,28 +175,75 @@ class ActivityBase(SQLModel):
 class Activity(ActivityBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     actor_user_id: Optional[int] = Field(default=None, foreign_key="user.id")
-    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    created_at: datetime = Field(sa_column=Column(DateTime, server_default=func.now(), nullable=False))
 
-    actor: Mapped[Optional[User]] = Relationship(back_populates="activities")
-    store: Mapped[Optional[Store]] = Relationship(
-        sa_relationship_kwargs={
-            "primaryjoin": lambda: and_(
-                foreign(Activity.entity_id) == Store.id,
-                Activity.entity_type == ActivityEntityType.STORE,
-            ),
-            "viewonly": True,
-        }
-    )
-    order: Mapped[Optional[Order]] = Relationship(
-        sa_relationship_kwargs={
-            "primaryjoin": lambda: and_(
-                foreign(Activity.entity_id) == Order.id,
-                Activity.entity_type == ActivityEntityType.ORDER,
-            ),
-            "viewonly": True,
-        }
+    actor: Mapped[Optional[User]] = Relationship(
+        back_populates="activities", sa_relationship_kwargs={"lazy": "joined"}
     )
 
+    def resolve_entity(self, session) -> Optional[SQLModel]:
+        """Fetch the referenced row for this activity's entity_type.
+
+        A plain primary-key get replaces the old viewonly primaryjoin
+        relationships, whose discriminating outer joins loaded both targets
+        even when only one could apply. For feeds, prefer
+        auth.resolve_activity_entities, which batches per type.
+        """
+
+        return session.get(_ACTIVITY_ENTITY_MODELS[self.entity_type], self.entity_id)
+
+
+class RollupStoreMonth(SQLModel, table=True):
+    """Per-store monthly order aggregates, refreshed by services.rollups.
+
+    Reports read these instead of re-scanning Order for every page load.
+    """
+
+    __tablename__ = "rollup_store_month"
+
+    store_id: int = Field(foreign_key="store.id", primary_key=True)
+    month: str = Field(primary_key=True)
+    orders: int = 0
+    subtotal: float = 0.0
+    excise_tax: float = 0.0
+    taxes: float = 0.0
+    total: float = 0.0
+
+
+class RollupStoreProduct(SQLModel, table=True):
+    """Per-store product/category revenue aggregates for the item reports."""
+
+    __tablename__ = "rollup_store_product"
+
+    store_id: int = Field(foreign_key="store.id", primary_key=True)
+    category: str = Field(default="", primary_key=True)
+    product_name: str = Field(primary_key=True)
+    revenue: float = 0.0
+    qty: int = 0
+
+
+class GeocodeCache(SQLModel, table=True):
+    """Durable geocoder results keyed by normalized address.
+
+    Survives restarts so repeat addresses skip the Google round trip (and
+    its billing); utils.geocode refreshes rows older than 90 days.
+    """
+
+    __tablename__ = "geocode_cache"
+
+    address: str = Field(primary_key=True)
+    latitude: float
+    longitude: float
+    place_id: Optional[str] = None
+    fetched_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+_ACTIVITY_ENTITY_MODELS = {
+    ActivityEntityType.STORE: Store,
+    ActivityEntityType.ORDER: Order,
+    ActivityEntityType.USER: User,
+}
+
 
 class EmailRuleBase(SQLModel):
     trigger: EmailTrigger
@@ -177,5 +255,7 @@ class EmailRuleBase(SQLModel):
 
 class EmailRule(EmailRuleBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
-    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    created_at: datetime = Field(sa_column=Column(DateTime, server_default=func.now(), nullable=False))
+    updated_at: datetime = Field(
+        sa_column=Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    )
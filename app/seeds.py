@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import random
 from datetime import datetime, timedelta
+from functools import lru_cache
 
 from faker import Faker
 from sqlmodel import Session, select
@@ -9,6 +10,7 @@ from sqlmodel import Session, select
 from .auth import get_password_hash
 from .database import engine, init_db
 from .models import EmailRule, EmailTrigger, Order, OrderItem, Store, StoreStatus, User, UserRole
+from .services.rollups import refresh_rollups
 from .settings import settings
 
 fake = Faker("en_CA")
@@ -17,11 +19,18 @@ PROVINCES = ["AB", "BC", "ON", "QC"]
 CATEGORIES = ["Disposable", "E-Liquid", "Pod", "Accessory"]
 
 
+@lru_cache(maxsize=1)
+def _seed_password_hash() -> str:
+    # Every seeded account shares the demo password; hash it once instead
+    # of paying the deliberately slow KDF per user.
+    return get_password_hash("Welcome123")
+
+
 def create_user(session: Session, name: str, email: str, role: UserRole) -> User:
     existing = session.exec(select(User).where(User.email == email)).first()
     if existing:
         return existing
-    user = User(name=name, email=email, role=role, password_hash=get_password_hash("Welcome123"))
+    user = User(name=name, email=email, role=role, password_hash=_seed_password_hash())
     session.add(user)
     session.commit()
     session.refresh(user)
@@ -38,36 +47,47 @@ def seed() -> None:
         if session.exec(select(Store)).first():
             return
 
+        store_count = 100
+        # Faker calls dominate the Python side of seeding; draw every value
+        # up front in batches and index into the lists inside the loop.
+        companies = [fake.company() for _ in range(store_count)]
+        cities = [fake.city() for _ in range(store_count)]
+        addresses = [fake.street_address() for _ in range(store_count)]
+        postals = [fake.postalcode() for _ in range(store_count)]
+        phones = [fake.phone_number() for _ in range(store_count)]
+        emails = [fake.company_email() for _ in range(store_count)]
+        lats = [float(fake.latitude()) for _ in range(store_count)]
+        lons = [float(fake.longitude()) for _ in range(store_count)]
+        statuses = random.choices(
+            [StoreStatus.LEAD, StoreStatus.ACTIVE, StoreStatus.DORMANT, StoreStatus.CLOSED],
+            weights=[0.2, 0.5, 0.2, 0.1],
+            k=store_count,
+        )
+
         stores: list[Store] = []
-        for _ in range(100):
-            owner = random.choice(salesmen)
-            sub_owner = random.choice(subs)
-            status = random.choices(
-                [StoreStatus.LEAD, StoreStatus.ACTIVE, StoreStatus.DORMANT, StoreStatus.CLOSED],
-                weights=[0.2, 0.5, 0.2, 0.1],
-                k=1,
-            )[0]
-            city = fake.city()
-            province = random.choice(PROVINCES)
+        for i in range(store_count):
             store = Store(
-                display_name=fake.company(),
-                city=city,
-                province=province,
-                address1=fake.street_address(),
-                postal_code=fake.postalcode(),
-                phone=fake.phone_number(),
-                email=fake.company_email(),
-                latitude=float(fake.latitude()),
-                longitude=float(fake.longitude()),
-                status=status,
-                owner_user_id=owner.id,
-                sub_owner_user_id=sub_owner.id,
+                display_name=companies[i],
+                city=cities[i],
+                province=random.choice(PROVINCES),
+                address1=addresses[i],
+                postal_code=postals[i],
+                phone=phones[i],
+                email=emails[i],
+                latitude=lats[i],
+                longitude=lons[i],
+                status=statuses[i],
+                owner_user_id=random.choice(salesmen).id,
+                sub_owner_user_id=random.choice(subs).id,
             )
-            session.add(store)
-            session.commit()
-            session.refresh(store)
             stores.append(store)
+        session.add_all(stores)
+        # One flush assigns every store id for the order FKs below; the
+        # whole seed commits once at the end instead of per row.
+        session.flush()
 
+        orders: list[Order] = []
+        items: list[OrderItem] = []
         for store in stores:
             for months_back in range(1, 13):
                 if random.random() < 0.4:
@@ -88,18 +108,26 @@ def seed() -> None:
                     status="completed",
                 )
                 order.total = order.subtotal + order.excise_tax + order.gst_hst + order.pst + order.shipping - order.discount
-                session.add(order)
-                session.commit()
-                session.refresh(order)
-
-                for _ in range(random.randint(1, 4)):
-                    category = random.choice(CATEGORIES)
-                    qty = random.randint(1, 12)
-                    unit_price = random.uniform(10, 40)
-                    item = OrderItem(
+                orders.append(order)
+                store.last_order_date = order.order_date.date()
+        session.add_all(orders)
+        session.flush()
+
+        # Shared pools are plenty for fake data; random.choice over a
+        # pre-generated list is far cheaper than a Faker call per item.
+        sku_pool = [fake.ean(length=8) for _ in range(2000)]
+        word_pool = [fake.word().title() for _ in range(500)]
+
+        for order in orders:
+            for _ in range(random.randint(1, 4)):
+                category = random.choice(CATEGORIES)
+                qty = random.randint(1, 12)
+                unit_price = random.uniform(10, 40)
+                items.append(
+                    OrderItem(
                         order_id=order.id,
-                        sku=fake.ean(length=8),
-                        product_name=f"{category} {fake.word().title()}",
+                        sku=random.choice(sku_pool),
+                        product_name=f"{category} {random.choice(word_pool)}",
                         category=category,
                         nicotine_pct=random.choice([None, 20.0, 35.0, 50.0]),
                         puff_count=random.choice([None, 2000, 3000, 5000]),
@@ -108,15 +136,14 @@ def seed() -> None:
                         unit_price=unit_price,
                         line_total=qty * unit_price,
                     )
-                    session.add(item)
-                store.last_order_date = order.order_date.date()
-                session.add(store)
-                session.commit()
+                )
+        session.add_all(items)
 
         for trigger in EmailTrigger:
             rule = EmailRule(trigger=trigger, to_emails=[settings.default_admin_email], template_name="default")
             session.add(rule)
         session.commit()
+        refresh_rollups(session)
 
 
 if __name__ == "__main__":
@@ -2,16 +2,21 @@ from __future__ import annotations
 
 import csv
 import io
+import re
 from datetime import datetime
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import IO, Dict, Iterable, List, Optional, Tuple
 
+import orjson
 from dateutil import parser
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
+from sqlalchemy import delete, insert
 from sqlmodel import Session, select
 
-from ..auth import record_activity
+from ..auth import record_activities
 from ..models import ActivityEntityType, Order, OrderItem, Store, StoreStatus, User, UserRole
 
+_LINE_COLUMN = re.compile(r"line_(\d+)_")
+
 MANDATORY_COLUMNS = {
     "order_id",
     "order_date",
@@ -69,32 +74,67 @@ def _parse_int(value: str) -> int:
         return 0
 
 
+# WooCommerce exports use a fixed timestamp format; try the cheap
+# C-implemented strptime first and only fall back to dateutil's slow
+# guessing parser for oddball values.
+_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+
 def _parse_date(value: str) -> datetime:
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
     return parser.parse(value)
 
 
-def match_store(session: Session, row: Dict[str, str]) -> Optional[Store]:
+class StoreIndex:
+    """In-memory lookup of existing stores, built once per import.
+
+    Matching per row used to re-query (and, on a fuzzy fallback, re-fetch
+    the whole store table) from the DB; dict lookups plus one batched
+    rapidfuzz call keep it O(1)-ish per row instead of O(rows x stores).
+    """
+
+    def __init__(self, stores: Iterable[Store]) -> None:
+        self.by_name: Dict[str, Store] = {}
+        self.by_email: Dict[str, Store] = {}
+        self.by_phone: Dict[str, Store] = {}
+        for store in stores:
+            self.add(store)
+
+    def add(self, store: Store) -> None:
+        self.by_name.setdefault(store.display_name.lower(), store)
+        if store.email:
+            self.by_email.setdefault(store.email.lower(), store)
+        if store.phone:
+            self.by_phone.setdefault(store.phone, store)
+
+
+def match_store(index: StoreIndex, row: Dict[str, str]) -> Optional[Store]:
     company = (row.get("billing_company") or "").strip()
     email = (row.get("billing_email") or "").strip().lower()
     phone = (row.get("billing_phone") or "").strip()
 
     if company:
-        store = session.exec(select(Store).where(Store.display_name == company)).first()
+        key = company.lower()
+        store = index.by_name.get(key)
         if store:
             return store
-        stores = session.exec(select(Store)).all()
-        for candidate in stores:
-            score = fuzz.ratio(candidate.display_name.lower(), company.lower())
-            if score > 90:
-                return candidate
+        # extractOne runs the whole candidate set through rapidfuzz's C++
+        # scorer in one call instead of a Python loop of fuzz.ratio calls.
+        match = process.extractOne(key, index.by_name.keys(), scorer=fuzz.ratio, score_cutoff=90)
+        if match:
+            return index.by_name[match[0]]
 
     if email:
-        store = session.exec(select(Store).where(Store.email == email)).first()
+        store = index.by_email.get(email)
         if store:
             return store
 
     if phone:
-        store = session.exec(select(Store).where(Store.phone == phone)).first()
+        store = index.by_phone.get(phone)
         if store:
             return store
 
@@ -114,37 +154,53 @@ def _infer_store_province(row: Dict[str, str]) -> str:
     return mapping.get(province, province[:2]) or "NA"
 
 
+# One compiled scan of the product name replaces the per-token Python
+# checks; each alternative fills one attribute via its named group.
+_ATTR_RE = re.compile(r"(?P<nic>\d+(?:\.\d+)?)mg\b|(?P<puff>\d+)puffs?\b|\b(?P<ice>iced?)\b", re.IGNORECASE)
+
+
 def infer_item_attributes(name: str) -> Tuple[Optional[float], Optional[int], Optional[str]]:
     nicotine = None
     puffs = None
     ice = None
 
-    for token in name.split():
-        if token.endswith("mg"):
-            try:
-                nicotine = float(token.replace("mg", ""))
-            except ValueError:
-                pass
-        if token.lower().endswith("puff") or token.lower().endswith("puffs"):
-            digits = "".join(filter(str.isdigit, token))
-            if digits:
-                puffs = int(digits)
-        if token.lower() in {"ice", "iced"}:
+    for match in _ATTR_RE.finditer(name):
+        if match.group("nic"):
+            nicotine = float(match.group("nic"))
+        elif match.group("puff"):
+            puffs = int(match.group("puff"))
+        elif match.group("ice"):
             ice = "ICE"
     return nicotine, puffs, ice
 
 
-def import_orders(session: Session, *, current_user: User, file_content: bytes) -> ImportSummary:
+def import_orders(session: Session, *, current_user: User, stream: IO[bytes]) -> ImportSummary:
+    """Import WooCommerce orders from a binary CSV stream.
+
+    The stream is consumed row by row, so memory stays bounded by a single
+    row regardless of upload size.
+    """
+
     summary = ImportSummary()
-    decoded = file_content.decode("utf-8-sig")
-    buffer = io.StringIO(decoded)
-    reader = csv.DictReader(buffer)
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    # restkey must be a string: extra trailing fields otherwise land under
+    # the None key, which orjson rejects when the raw row is serialized.
+    reader = csv.DictReader(text, restkey="_extra")
     headers = [normalize_header(h) for h in reader.fieldnames or []]
-    header_map = dict(zip(reader.fieldnames or [], headers))
     _validate_headers(headers)
-
-    for raw_row in reader:
-        row = {header_map[key]: value for key, value in raw_row.items()}
+    # Normalizing the fieldnames on the reader itself makes the C csv
+    # machinery emit rows keyed by the clean headers directly, instead of
+    # rebuilding every row dict in Python.
+    reader.fieldnames = headers
+    # Work out which line_N_ column groups exist once, instead of probing
+    # up to 19 prefixes against every row's keys.
+    line_numbers = {int(match.group(1)) for header in headers if (match := _LINE_COLUMN.match(header))}
+    line_prefixes = [f"line_{index}_" for index in sorted(line_numbers)]
+
+    store_index = StoreIndex(session.exec(select(Store)))
+
+    activity_entries: List[Dict] = []
+    for row in reader:
         if not row.get("order_id"):
             summary.skipped += 1
             continue
@@ -154,7 +210,7 @@ def import_orders(session: Session, *, current_user: User, file_content: bytes)
             summary.skipped += 1
             continue
 
-        store = match_store(session, row)
+        store = match_store(store_index, row)
         if not store:
             store = Store(
                 display_name=row.get("billing_company") or "Unknown Store",
@@ -170,8 +226,8 @@ def import_orders(session: Session, *, current_user: User, file_content: bytes)
             if current_user.role in {UserRole.SALESMAN, UserRole.SUBSALESMAN}:
                 store.owner_user_id = current_user.id
             session.add(store)
-            session.commit()
-            session.refresh(store)
+            session.flush()
+            store_index.add(store)
             summary.unmatched += 1
 
         order = session.exec(select(Order).where(Order.external_id == row["order_id"])).first()
@@ -189,22 +245,18 @@ def import_orders(session: Session, *, current_user: User, file_content: bytes)
         tax_total = _parse_float(row.get("tax_total"))
         order.gst_hst = tax_total * 0.7
         order.pst = tax_total * 0.3
-        order.raw_import_payload = str(row)
+        order.raw_import_payload = orjson.dumps(row).decode()
         order.store_id = store.id
         session.add(order)
-        session.commit()
-        session.refresh(order)
+        # Flush assigns the order id for item FKs; the single commit at the
+        # end of the import covers every row.
+        session.flush()
 
-        existing_items = list(session.exec(select(OrderItem).where(OrderItem.order_id == order.id)))
-        for existing in existing_items:
-            session.delete(existing)
-        session.commit()
+        if not is_new:
+            session.execute(delete(OrderItem).where(OrderItem.order_id == order.id))
 
         line_items: List[Dict[str, str]] = []
-        for index in range(1, 20):
-            prefix = f"line_{index}_"
-            if not any(key.startswith(prefix) for key in row.keys()):
-                continue
+        for prefix in line_prefixes:
             name = row.get(f"{prefix}name") or row.get(f"{prefix}product_name")
             if not name:
                 continue
@@ -229,9 +281,7 @@ def import_orders(session: Session, *, current_user: User, file_content: bytes)
 
         if not line_items and row.get("line_items"):
             try:
-                import json
-
-                parsed = json.loads(row["line_items"])
+                parsed = orjson.loads(row["line_items"])
                 for item in parsed:
                     nicotine, puffs, ice = infer_item_attributes(item.get("name", ""))
                     line_items.append(
@@ -251,24 +301,23 @@ def import_orders(session: Session, *, current_user: User, file_content: bytes)
                 summary.skipped += 1
                 continue
 
-        for item in line_items:
-            order_item = OrderItem(order_id=order.id, **item)
-            session.add(order_item)
-        session.commit()
+        if line_items:
+            # Core executemany skips per-object ORM bookkeeping; item ids are
+            # never read back.
+            session.execute(insert(OrderItem), [{"order_id": order.id, **item} for item in line_items])
 
         dates = [value for value in [store.last_order_date, order.order_date.date()] if value]
         if dates:
             store.last_order_date = max(dates)
             session.add(store)
-            session.commit()
-
-        record_activity(
-            session,
-            actor=current_user,
-            entity_type=ActivityEntityType.ORDER,
-            entity_id=order.id,
-            action="order_imported" if is_new else "order_updated",
-            metadata=row.get("status"),
+
+        activity_entries.append(
+            {
+                "entity_type": ActivityEntityType.ORDER,
+                "entity_id": order.id,
+                "action": "order_imported" if is_new else "order_updated",
+                "metadata": row.get("status"),
+            }
         )
 
         if is_new:
@@ -276,4 +325,7 @@ def import_orders(session: Session, *, current_user: User, file_content: bytes)
         else:
             summary.updated += 1
 
+    # One executemany for the whole file's audit trail, then one commit.
+    record_activities(session, actor=current_user, entries=activity_entries, commit=False)
+    session.commit()
     return summary
@@ -3,23 +3,45 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from typing import Dict, List
 
+from sqlalchemy import Row
 from sqlmodel import Session, func, select
 
-from ..models import Order, OrderItem, Store, User, UserRole
+from ..models import Order, RollupStoreMonth, RollupStoreProduct, Store, User, UserRole
+
+
+def _apply_role_filter(query, current_user: User):
+    """Constrain a Store-joined query to the rows the user may report on.
+
+    Salesmen and clients are scoped to stores they own, sub-salesmen to
+    stores they sub-own; admins see everything. One helper keeps every
+    report using the same indexed predicates.
+    """
+
+    if current_user.role in (UserRole.SALESMAN, UserRole.CLIENT):
+        return query.where(Store.owner_user_id == current_user.id)
+    if current_user.role == UserRole.SUBSALESMAN:
+        return query.where(Store.sub_owner_user_id == current_user.id)
+    return query
 
 
 def revenue_totals(session: Session, current_user: User, start: datetime | None = None, end: datetime | None = None) -> Dict[str, float]:
-    query = select(func.sum(Order.total), func.sum(Order.subtotal), func.count(Order.id)).join(Store)
-    if start:
-        query = query.where(Order.order_date >= start)
-    if end:
-        query = query.where(Order.order_date <= end)
-    if current_user.role == UserRole.SALESMAN:
-        query = query.where(Store.owner_user_id == current_user.id)
-    elif current_user.role == UserRole.SUBSALESMAN:
-        query = query.where(Store.sub_owner_user_id == current_user.id)
-    elif current_user.role == UserRole.CLIENT:
-        query = query.where(Store.owner_user_id == current_user.id)
+    # Month-aligned windows (the dashboard's MTD/YTD calls) are served from
+    # the rollup; arbitrary bounds fall back to scanning Order.
+    if end is None and (start is None or (start.day == 1 and start.time() == start.min.time())):
+        query = select(
+            func.sum(RollupStoreMonth.total),
+            func.sum(RollupStoreMonth.subtotal),
+            func.sum(RollupStoreMonth.orders),
+        ).join(Store, RollupStoreMonth.store_id == Store.id)
+        if start:
+            query = query.where(RollupStoreMonth.month >= start.strftime("%Y-%m"))
+    else:
+        query = select(func.sum(Order.total), func.sum(Order.subtotal), func.count(Order.id)).join(Store)
+        if start:
+            query = query.where(Order.order_date >= start)
+        if end:
+            query = query.where(Order.order_date <= end)
+    query = _apply_role_filter(query, current_user)
     total, subtotal, count = session.exec(query).first()
     return {
         "total": float(total or 0),
@@ -31,22 +53,17 @@ def revenue_totals(session: Session, current_user: User, start: datetime | None
 def monthly_spend(session: Session, current_user: User) -> List[Dict[str, object]]:
     query = select(
         Store.display_name,
-        func.strftime("%Y-%m", Order.order_date).label("month"),
-        func.sum(Order.total),
-        func.sum(Order.excise_tax),
-        func.sum(Order.gst_hst + Order.pst),
-        func.sum(Order.subtotal),
-        func.count(Order.id),
-    ).join(Store)
-
-    if current_user.role == UserRole.SALESMAN:
-        query = query.where(Store.owner_user_id == current_user.id)
-    elif current_user.role == UserRole.SUBSALESMAN:
-        query = query.where(Store.sub_owner_user_id == current_user.id)
-    elif current_user.role == UserRole.CLIENT:
-        query = query.where(Store.owner_user_id == current_user.id)
-
-    query = query.group_by(Store.display_name, "month").order_by("month")
+        RollupStoreMonth.month,
+        RollupStoreMonth.total,
+        RollupStoreMonth.excise_tax,
+        RollupStoreMonth.taxes,
+        RollupStoreMonth.subtotal,
+        RollupStoreMonth.orders,
+    ).join(Store, RollupStoreMonth.store_id == Store.id)
+
+    query = _apply_role_filter(query, current_user)
+
+    query = query.order_by(RollupStoreMonth.month)
 
     results = []
     for name, month, total, excise, taxes, subtotal, count in session.exec(query):
@@ -67,16 +84,11 @@ def monthly_spend(session: Session, current_user: User) -> List[Dict[str, object
 def province_breakdown(session: Session, current_user: User) -> List[Dict[str, object]]:
     query = select(
         Store.province,
-        func.count(Store.id),
-        func.sum(Order.total),
-    ).join(Store)
+        func.sum(RollupStoreMonth.orders),
+        func.sum(RollupStoreMonth.total),
+    ).join(Store, RollupStoreMonth.store_id == Store.id)
 
-    if current_user.role == UserRole.SALESMAN:
-        query = query.where(Store.owner_user_id == current_user.id)
-    elif current_user.role == UserRole.SUBSALESMAN:
-        query = query.where(Store.sub_owner_user_id == current_user.id)
-    elif current_user.role == UserRole.CLIENT:
-        query = query.where(Store.owner_user_id == current_user.id)
+    query = _apply_role_filter(query, current_user)
 
     query = query.group_by(Store.province).order_by(Store.province)
     results = []
@@ -85,57 +97,52 @@ def province_breakdown(session: Session, current_user: User) -> List[Dict[str, o
     return results
 
 
-def inactive_stores(session: Session, current_user: User, days: int = 30) -> List[Store]:
+def inactive_stores(session: Session, current_user: User, days: int = 30) -> List[Row]:
+    """List stores with no recent orders as light row tuples.
+
+    Only the columns the templates render are selected, so large result
+    sets don't hydrate full Store instances into the identity map.
+    """
+
     cutoff = datetime.utcnow().date() - timedelta(days=days)
-    query = select(Store).where((Store.last_order_date == None) | (Store.last_order_date < cutoff))  # noqa: E711
-    if current_user.role == UserRole.SALESMAN:
-        query = query.where(Store.owner_user_id == current_user.id)
-    elif current_user.role == UserRole.SUBSALESMAN:
-        query = query.where(Store.sub_owner_user_id == current_user.id)
-    elif current_user.role == UserRole.CLIENT:
-        query = query.where(Store.owner_user_id == current_user.id)
+    query = select(Store.display_name, Store.city, Store.province, Store.last_order_date).where(
+        (Store.last_order_date == None) | (Store.last_order_date < cutoff)  # noqa: E711
+    )
+    query = _apply_role_filter(query, current_user)
     return list(session.exec(query))
 
 
 def category_mix(session: Session, current_user: User) -> Dict[str, float]:
-    query = select(OrderItem.category, func.sum(OrderItem.line_total)).join(Order).join(Store)
-    if current_user.role == UserRole.SALESMAN:
-        query = query.where(Store.owner_user_id == current_user.id)
-    elif current_user.role == UserRole.SUBSALESMAN:
-        query = query.where(Store.sub_owner_user_id == current_user.id)
-    elif current_user.role == UserRole.CLIENT:
-        query = query.where(Store.owner_user_id == current_user.id)
-    query = query.group_by(OrderItem.category)
-
-    totals: Dict[str, float] = {}
-    overall = 0.0
-    for category, total in session.exec(query):
-        totals[category or "Uncategorized"] = float(total or 0)
-        overall += float(total or 0)
-    if overall == 0:
-        return totals
-    return {category: round(value / overall * 100, 2) for category, value in totals.items()}
+    # The grand-total window over the grouped sums lets the DB return
+    # percentages directly in one round-trip.
+    category_revenue = func.sum(RollupStoreProduct.revenue)
+    pct = category_revenue * 100.0 / func.sum(category_revenue).over()
+    query = select(RollupStoreProduct.category, pct).join(
+        Store, RollupStoreProduct.store_id == Store.id
+    )
+    query = _apply_role_filter(query, current_user)
+    query = query.group_by(RollupStoreProduct.category)
+
+    return {
+        category or "Uncategorized": round(float(value or 0), 2)
+        for category, value in session.exec(query)
+    }
 
 
 def top_products(session: Session, current_user: User, limit: int = 20) -> List[Dict[str, object]]:
-    query = (
-        select(
-            OrderItem.product_name,
-            func.sum(OrderItem.line_total),
-            func.sum(OrderItem.qty),
-        )
-        .join(Order)
-        .join(Store)
-    )
+    query = select(
+        RollupStoreProduct.product_name,
+        func.sum(RollupStoreProduct.revenue),
+        func.sum(RollupStoreProduct.qty),
+    ).join(Store, RollupStoreProduct.store_id == Store.id)
 
-    if current_user.role == UserRole.SALESMAN:
-        query = query.where(Store.owner_user_id == current_user.id)
-    elif current_user.role == UserRole.SUBSALESMAN:
-        query = query.where(Store.sub_owner_user_id == current_user.id)
-    elif current_user.role == UserRole.CLIENT:
-        query = query.where(Store.owner_user_id == current_user.id)
+    query = _apply_role_filter(query, current_user)
 
-    query = query.group_by(OrderItem.product_name).order_by(func.sum(OrderItem.line_total).desc()).limit(limit)
+    query = (
+        query.group_by(RollupStoreProduct.product_name)
+        .order_by(func.sum(RollupStoreProduct.revenue).desc())
+        .limit(limit)
+    )
     results = []
     for name, revenue, qty in session.exec(query):
         results.append({"product": name, "revenue": float(revenue or 0), "quantity": int(qty or 0)})
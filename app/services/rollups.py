@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from sqlalchemy import delete, insert
+from sqlmodel import Session, func, select
+
+from ..models import Order, OrderItem, RollupStoreMonth, RollupStoreProduct
+
+
+def refresh_rollups(session: Session) -> None:
+    """Rebuild the report rollup tables from Order/OrderItem.
+
+    Runs as one INSERT ... SELECT per table inside a single transaction, so
+    readers never see a half-built rollup. Called at startup, after seeding,
+    and after each order import — the only paths that write orders.
+    """
+
+    session.execute(delete(RollupStoreMonth))
+    session.execute(
+        insert(RollupStoreMonth).from_select(
+            ["store_id", "month", "orders", "subtotal", "excise_tax", "taxes", "total"],
+            select(
+                Order.store_id,
+                func.strftime("%Y-%m", Order.order_date),
+                func.count(Order.id),
+                func.coalesce(func.sum(Order.subtotal), 0.0),
+                func.coalesce(func.sum(Order.excise_tax), 0.0),
+                func.coalesce(func.sum(Order.gst_hst + Order.pst), 0.0),
+                func.coalesce(func.sum(Order.total), 0.0),
+            )
+            .where(Order.store_id.is_not(None))
+            .group_by(Order.store_id, func.strftime("%Y-%m", Order.order_date)),
+        )
+    )
+
+    session.execute(delete(RollupStoreProduct))
+    session.execute(
+        insert(RollupStoreProduct).from_select(
+            ["store_id", "category", "product_name", "revenue", "qty"],
+            select(
+                Order.store_id,
+                func.coalesce(OrderItem.category, ""),
+                OrderItem.product_name,
+                func.coalesce(func.sum(OrderItem.line_total), 0.0),
+                func.coalesce(func.sum(OrderItem.qty), 0),
+            )
+            .join(Order, OrderItem.order_id == Order.id)
+            .where(Order.store_id.is_not(None))
+            .group_by(Order.store_id, OrderItem.category, OrderItem.product_name),
+        )
+    )
+    session.commit()
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from math import atan2, cos, radians, sin, sqrt
+from math import atan2, cos, inf, radians, sin, sqrt
 from typing import List, Sequence
 
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
 from ..models import Route, RouteStatus, RouteStop, Store, User, UserRole
@@ -28,35 +30,107 @@ def _travel_minutes(distance_km: float) -> float:
     return (distance_km / AVERAGE_SPEED_KMH) * 60.0
 
 
-def optimize_store_sequence(stores: Sequence[Store]) -> List[Store]:
-    """Return stores ordered using a nearest-neighbour heuristic."""
-
-    remaining = [store for store in stores if store.latitude is not None and store.longitude is not None]
-    unordered = [store for store in stores if store not in remaining]
-    if not remaining:
-        return list(stores)
-
-    ordered: List[Store] = []
-    current = remaining.pop(0)
-    ordered.append(current)
-    while remaining:
-        current_lat = current.latitude or 0.0
-        current_lon = current.longitude or 0.0
-        next_store = min(
-            remaining,
-            key=lambda candidate: _haversine_distance_km(
-                current_lat,
-                current_lon,
-                candidate.latitude or current_lat,
-                candidate.longitude or current_lon,
-            ),
-        )
-        ordered.append(next_store)
-        remaining.remove(next_store)
-        current = next_store
+def _pairwise_distances_km(stores: Sequence[Store]) -> List[List[float]]:
+    """Symmetric haversine distance matrix, computing the trig terms once."""
 
+    lats = [radians(store.latitude) for store in stores]
+    lons = [radians(store.longitude) for store in stores]
+    cos_lats = [cos(lat) for lat in lats]
+    count = len(stores)
+    distances = [[0.0] * count for _ in range(count)]
+    earth_radius_km = 6371.0
+    for i in range(count):
+        for j in range(i + 1, count):
+            a = (
+                sin((lats[j] - lats[i]) / 2) ** 2
+                + cos_lats[i] * cos_lats[j] * sin((lons[j] - lons[i]) / 2) ** 2
+            )
+            d = 2 * earth_radius_km * atan2(sqrt(a), sqrt(1 - a))
+            distances[i][j] = distances[j][i] = d
+    return distances
+
+
+def _nearest_neighbour_order(distances: List[List[float]]) -> List[int]:
+    count = len(distances)
+    visited = [False] * count
+    visited[0] = True
+    order = [0]
+    current = 0
+    for _ in range(count - 1):
+        row = distances[current]
+        best = -1
+        best_d = inf
+        for candidate in range(count):
+            if not visited[candidate] and row[candidate] < best_d:
+                best_d = row[candidate]
+                best = candidate
+        visited[best] = True
+        order.append(best)
+        current = best
+    return order
+
+
+def _two_opt(order: List[int], distances: List[List[float]], max_passes: int = 25) -> List[int]:
+    """Improve a tour in place by reversing segments while distance drops.
+
+    Greedy nearest-neighbour tours routinely come out ~25% longer than
+    optimal; a handful of 2-opt passes over the cached distance matrix
+    closes most of that gap with only matrix lookups, no extra trig.
+    """
+
+    count = len(order)
+    improved = True
+    passes = 0
+    while improved and passes < max_passes:
+        improved = False
+        passes += 1
+        for i in range(1, count - 1):
+            for j in range(i + 1, count):
+                a, b = order[i - 1], order[i]
+                c = order[j]
+                if j + 1 < count:
+                    d = order[j + 1]
+                    delta = distances[a][c] + distances[b][d] - distances[a][b] - distances[c][d]
+                else:
+                    # The tour is open-ended, so the last edge just moves.
+                    delta = distances[a][c] - distances[a][b]
+                if delta < -1e-9:
+                    order[i : j + 1] = order[j : i - 1 : -1]
+                    improved = True
+    return order
+
+
+def _plan_route(stores: Sequence[Store]) -> tuple[List[Store], List[float]]:
+    """Order stores and return the per-leg distances from the same matrix.
+
+    The ordering pass already computes every pairwise distance, so the leg
+    from each stop to the next is a matrix lookup; callers that need
+    totals or per-stop distances reuse these instead of re-running
+    haversine over the ordered list. Legs for stops without coordinates
+    (appended at the end) are zero, matching the old per-pair skips.
+    """
+
+    located = [store for store in stores if store.latitude is not None and store.longitude is not None]
+    if not located:
+        ordered = list(stores)
+        return ordered, [0.0] * len(ordered)
+    located_ids = {id(store) for store in located}
+    unordered = [store for store in stores if id(store) not in located_ids]
+
+    distances = _pairwise_distances_km(located)
+    order = _two_opt(_nearest_neighbour_order(distances), distances)
+
+    ordered = [located[index] for index in order]
+    legs = [0.0] + [distances[a][b] for a, b in zip(order, order[1:])]
     ordered.extend(unordered)
-    return ordered
+    legs.extend([0.0] * len(unordered))
+    return ordered, legs
+
+
+def optimize_store_sequence(stores: Sequence[Store]) -> List[Store]:
+    """Return stores ordered by nearest-neighbour plus a 2-opt refinement."""
+
+    return _plan_route(stores)[0]
 
 
 @dataclass
@@ -85,41 +159,31 @@ def calculate_route_metrics(stores: Sequence[Store]) -> RouteMetrics:
     return RouteMetrics(total_distance, total_minutes)
 
 
-def rebuild_route_stops(route: Route, stores: Sequence[Store], existing_comments: dict[int, str] | None = None) -> None:
-    ordered = optimize_store_sequence(stores)
-    metrics = calculate_route_metrics(ordered)
-    route.total_distance_km = round(metrics.total_distance_km, 1)
-    route.total_travel_minutes = round(metrics.total_travel_minutes, 1)
+def rebuild_route_stops(
+    session: Session, route: Route, stores: Sequence[Store], existing_comments: dict[int, str] | None = None
+) -> None:
+    ordered, legs = _plan_route(stores)
+    route.total_distance_km = round(sum(legs), 1)
+    route.total_travel_minutes = round(sum(_travel_minutes(distance) for distance in legs), 1)
 
     comment_lookup = existing_comments or {}
-    route.stops.clear()
-    previous_store: Store | None = None
-    for index, store in enumerate(ordered, start=1):
-        distance = 0.0
-        minutes = 0.0
-        if (
-            previous_store
-            and previous_store.latitude is not None
-            and previous_store.longitude is not None
-            and store.latitude is not None
-            and store.longitude is not None
-        ):
-            distance = _haversine_distance_km(
-                previous_store.latitude,
-                previous_store.longitude,
-                store.latitude,
-                store.longitude,
-            )
-            minutes = _travel_minutes(distance)
-        stop = RouteStop(
-            sequence=index,
-            store_id=store.id,
-            comments=comment_lookup.get(store.id),
-            travel_distance_km=round(distance, 2),
-            travel_minutes=round(minutes, 1),
-        )
-        route.stops.append(stop)
-        previous_store = store
+    # Replace the stops set-based: one DELETE plus one executemany INSERT
+    # instead of the per-row statements the route.stops collection cascade
+    # would emit on flush.
+    session.execute(delete(RouteStop).where(RouteStop.route_id == route.id))
+    rows = [
+        {
+            "route_id": route.id,
+            "sequence": index,
+            "store_id": store.id,
+            "comments": comment_lookup.get(store.id),
+            "travel_distance_km": round(distance, 2),
+            "travel_minutes": round(_travel_minutes(distance), 1),
+        }
+        for index, (store, distance) in enumerate(zip(ordered, legs), start=1)
+    ]
+    if rows:
+        session.execute(insert(RouteStop), rows)
 
 
 def user_can_edit_route(user: User, route: Route) -> bool:
@@ -141,7 +205,9 @@ def user_can_view_route(user: User, route: Route) -> bool:
 
 
 def list_accessible_routes(session: Session, current_user: User) -> List[Route]:
-    query = select(Route)
+    # Templates walk route.stops and each stop's store; selectinload keeps
+    # that at a fixed three queries instead of one per route and stop.
+    query = select(Route).options(selectinload(Route.stops).selectinload(RouteStop.store))
     if current_user.role != UserRole.ADMIN:
         query = query.where(
             (Route.created_by_user_id == current_user.id) | (Route.assigned_user_id == current_user.id)
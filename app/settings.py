@@ -13,6 +13,12 @@ class Settings(BaseSettings):
     secret_key: str = Field("changeme", env="SECRET_KEY")
     database_url: str = Field(f"sqlite:///{Path(__file__).resolve().parent / 'vape_crm.db'}", env="DATABASE_URL")
     debug: bool = Field(False, env="DEBUG")
+    argon2_time_cost: int = Field(3, env="ARGON2_TIME_COST")
+    argon2_memory_cost: int = Field(65536, env="ARGON2_MEMORY_COST")
+    argon2_parallelism: int = Field(4, env="ARGON2_PARALLELISM")
+    uvicorn_workers: Optional[int] = Field(None, env="UVICORN_WORKERS")
+    db_pool_size: int = Field(10, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(20, env="DB_MAX_OVERFLOW")
     google_maps_api_key: Optional[str] = Field(None, env="GOOGLE_MAPS_API_KEY")
     default_admin_email: EmailStr = Field("admin@example.com", env="DEFAULT_ADMIN_EMAIL")
     smtp_host: Optional[str] = Field(None, env="SMTP_HOST")
@@ -1,23 +1,88 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
 
 import httpx
+from sqlmodel import Session
 
+from ..database import engine
+from ..models import GeocodeCache
 from ..settings import settings
 
+# Geocoding an address is deterministic, so successful lookups are memoized
+# and re-imports of the same address skip the network hop.
+_GEOCODE_CACHE: dict[str, tuple[float, float, str]] = {}
+
+# Rows older than this are re-fetched in case the address was re-geocoded.
+_DB_CACHE_MAX_AGE = timedelta(days=90)
+
+# One client for the process: keep-alive connections reuse the TLS session
+# and DNS result instead of paying a full handshake per address.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(max_keepalive_connections=20))
+    return _client
+
+
+def _normalize(address: str) -> str:
+    return " ".join(address.split()).lower()
+
+
+def _db_lookup(key: str) -> Optional[tuple[float, float, str]]:
+    with Session(engine) as session:
+        row = session.get(GeocodeCache, key)
+        if row is None or datetime.utcnow() - row.fetched_at > _DB_CACHE_MAX_AGE:
+            return None
+        return (row.latitude, row.longitude, row.place_id)
+
+
+def _db_store(key: str, result: tuple[float, float, str]) -> None:
+    with Session(engine) as session:
+        session.merge(
+            GeocodeCache(
+                address=key,
+                latitude=result[0],
+                longitude=result[1],
+                place_id=result[2],
+                fetched_at=datetime.utcnow(),
+            )
+        )
+        session.commit()
+
 
 async def geocode_address(address: str) -> Optional[tuple[float, float, str]]:
     if not settings.google_maps_api_key:
         return None
+    key = _normalize(address)
+    cached = _GEOCODE_CACHE.get(key)
+    if cached is not None:
+        return cached
+    stored = await asyncio.to_thread(_db_lookup, key)
+    if stored is not None:
+        _GEOCODE_CACHE[key] = stored
+        return stored
     params = {"address": address, "key": settings.google_maps_api_key}
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get("https://maps.googleapis.com/maps/api/geocode/json", params=params)
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("results") or []
-        if not results:
-            return None
-        location = results[0]["geometry"]["location"]
-        place_id = results[0].get("place_id")
-        return location["lat"], location["lng"], place_id
+    response = await _get_client().get("https://maps.googleapis.com/maps/api/geocode/json", params=params)
+    response.raise_for_status()
+    data = response.json()
+    results = data.get("results") or []
+    if not results:
+        return None
+    location = results[0]["geometry"]["location"]
+    place_id = results[0].get("place_id")
+    result = (location["lat"], location["lng"], place_id)
+    _GEOCODE_CACHE[key] = result
+    await asyncio.to_thread(_db_store, key, result)
+    return result
+
+
+async def geocode_addresses(addresses: Iterable[str]) -> list[Optional[tuple[float, float, str]]]:
+    """Geocode many addresses concurrently over the shared client."""
+
+    return list(await asyncio.gather(*(geocode_address(address) for address in addresses)))